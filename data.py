@@ -1,11 +1,59 @@
-import sqlite3
 import ccxt
+import ccxt.pro as ccxtpro
+import functools
 import logging
-from datetime import datetime
+import pandas as pd
+import queue
+import threading
+import time
 from config import API_KEY, API_SECRET
+from db import connect
 
 logger = logging.getLogger(__name__)
 
+
+def ttl_cache(ttl):
+    """Caches results for ttl seconds, keyed on the call arguments.
+
+    Collapses the duplicate ticker/balance round-trips that several engine
+    methods would otherwise make within the same bar.
+    """
+    def decorator(func):
+        cache = {}
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            now = time.monotonic()
+            cached = cache.get(args)
+            if cached is not None and cached[1] > now:
+                return cached[0]
+            value = func(*args)
+            cache[args] = (value, now + ttl)
+            return value
+        return wrapper
+    return decorator
+
+# The bot trades exactly one market on one timeframe; bake them in once
+# instead of re-deriving anything per call.
+SYMBOL = 'RUNE/USDT'
+TIMEFRAME = '1m'
+
+# Kept as a module-level constant so every call hands SQLite the exact same
+# SQL text and hits the connection's prepared-statement cache.
+SQL_INSERT_OHLCV = "INSERT INTO RUNE_USDT_prices (timestamp, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?)"
+
+# Retention for the price history: rows older than this are purged daily so
+# the table (and its index) stays within the page cache.
+RETENTION_MS = 30 * 24 * 3600 * 1000
+PURGE_INTERVAL_S = 24 * 3600
+
+# Columnar snapshot of the recent history for strategy reads: Parquet
+# deserializes straight into typed NumPy columns instead of materializing a
+# Python tuple per row. SQLite stays the append-only log of record.
+PARQUET_PATH = 'prices.parquet'
+PARQUET_FLUSH_INTERVAL_S = 600
+PARQUET_SNAPSHOT_ROWS = 50000
+
 class MarketData:
     def __init__(self):
         self.exchange = ccxt.binance({
@@ -24,10 +72,76 @@ class MarketData:
 
         #self.exchange.set_sandbox_mode(True)
 
+        # One long-lived connection per process; reopening per call throws
+        # away SQLite's page cache. The lock is needed because the trading
+        # loop runs in its own thread alongside the Telegram bot.
+        self.conn = connect('data.db')
+        self.db_lock = threading.Lock()
+        self.create_table()
+        # Resolved once by prime_exchange; everything after that reuses the
+        # same market object instead of re-parsing the symbol per call
+        self.market = None
+
+        # Rows to persist go through a bounded queue to a writer thread, so
+        # the trading loop never waits on an fsync
+        self.write_queue = queue.Queue(maxsize=1024)
+        self.last_purge = 0.0
+        self.last_parquet_flush = 0.0
+        self.writer_thread = threading.Thread(target=self.writer_loop, daemon=True)
+        self.writer_thread.start()
+
+    def create_table(self):
+        with self.db_lock:
+            # Epoch ms as INTEGER: the raw value ccxt returns, smaller rows
+            # and cheap compares, with an index for range scans
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS RUNE_USDT_prices (
+                    timestamp INTEGER,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    volume REAL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_prices_ts ON RUNE_USDT_prices(timestamp)")
+            self.conn.commit()
+
+    def create_ws_exchange(self):
+        """Creates the WebSocket (ccxt.pro) client used for the streaming candle feed.
+
+        Built on demand so the aiohttp session binds to the event loop of the
+        thread that actually runs the watch loop.
+        """
+        return ccxtpro.binance({
+            'apiKey': API_KEY,
+            'secret': API_SECRET,
+            'enableRateLimit': True,
+            'options': {
+                'defaultType': 'future'
+            }
+        })
+
+    def prime_exchange(self):
+        """Loads the market table once at trading startup.
+
+        ccxt otherwise triggers an implicit load_markets on the first data
+        call; doing it here keeps that cost out of the trading loop and
+        pins the market object for the one symbol we trade.
+        """
+        if self.market is not None:
+            return
+        try:
+            self.exchange.load_markets()
+            self.market = self.exchange.market(SYMBOL)
+            logger.info("Markets loaded; trading %s", self.market['id'])
+        except Exception as e:
+            logger.warning("Could not preload markets: %s", e)
+
     def fetch_data(self, limit=1):
         logger.info("Fetching price data")
         try:
-            ohlcv = self.exchange.fetch_ohlcv('RUNE/USDT', timeframe='1m', limit=limit)
+            ohlcv = self.exchange.fetch_ohlcv(SYMBOL, timeframe=TIMEFRAME, limit=limit)
             return ohlcv
         except Exception as e:
             return None
@@ -36,48 +150,80 @@ class MarketData:
         if not ohlcv:
             logger.error("No data to save")
             return
+        # Store the raw epoch ms straight from ccxt; no conversion at all on
+        # the ingest path, formatting happens only on read. The actual write
+        # happens on the writer thread.
+        for data in ohlcv:
+            try:
+                self.write_queue.put_nowait(tuple(data[:6]))
+            except queue.Full:
+                logger.warning("Price writer queue full; dropping a row")
+
+    def writer_loop(self):
+        """Drains queued rows and persists each batch in one transaction."""
+        while True:
+            rows = [self.write_queue.get()]
+            try:
+                while len(rows) < 512:
+                    rows.append(self.write_queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                with self.db_lock:
+                    # One explicit transaction for the whole batch: one fsync instead of one per row
+                    self.conn.execute("BEGIN")
+                    self.conn.executemany(SQL_INSERT_OHLCV, rows)
+                    self.conn.commit()
+            except Exception as e:
+                logger.error(f"Error saving price data: {e}")
+            self.purge_old_rows()
+            self.flush_parquet()
+
+    def flush_parquet(self):
+        """Rewrites the columnar snapshot of the recent history, at most every 10 minutes."""
+        now = time.time()
+        if now - self.last_parquet_flush < PARQUET_FLUSH_INTERVAL_S:
+            return
+        self.last_parquet_flush = now
         try:
-            conn = sqlite3.connect('data.db', check_same_thread=False)
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS RUNE_USDT_prices (
-                    timestamp TEXT,
-                    open REAL,
-                    high REAL,
-                    low REAL,
-                    close REAL,
-                    volume REAL
-                )
-            """)
-            for data in ohlcv:
-                cursor.execute("""
-                    INSERT INTO RUNE_USDT_prices (timestamp, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    datetime.fromtimestamp(data[0] / 1000).isoformat(),
-                    data[1],
-                    data[2],
-                    data[3],
-                    data[4],
-                    data[5]
-                ))
-            conn.commit()
+            with self.db_lock:
+                df = pd.read_sql_query(
+                    "SELECT * FROM RUNE_USDT_prices ORDER BY timestamp DESC LIMIT ?",
+                    self.conn, params=(PARQUET_SNAPSHOT_ROWS,))
+            df = df.iloc[::-1].reset_index(drop=True)
+            df.to_parquet(PARQUET_PATH)
+        except Exception as e:
+            logger.error(f"Error writing parquet snapshot: {e}")
+
+    def purge_old_rows(self):
+        """Deletes price rows older than the retention window, at most daily."""
+        now = time.time()
+        if now - self.last_purge < PURGE_INTERVAL_S:
+            return
+        self.last_purge = now
+        cutoff = int(now * 1000) - RETENTION_MS
+        try:
+            with self.db_lock:
+                self.conn.execute("DELETE FROM RUNE_USDT_prices WHERE timestamp < ?", (cutoff,))
+                self.conn.commit()
         except Exception as e:
-            conn.close()
+            logger.error(f"Error purging old price rows: {e}")
 
     def read_from_db(self):
         logger.info("Reading price data")
         try:
-            conn = sqlite3.connect('data.db', check_same_thread=False)
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM RUNE_USDT_prices")
-            rows = cursor.fetchall()
-            return rows
-            
+            with self.db_lock:
+                cursor = self.conn.execute("SELECT * FROM RUNE_USDT_prices")
+                return cursor.fetchall()
         except Exception as e:
             return []
-        finally:
-            conn.close()
 
+    @ttl_cache(1.0)
+    def fetch_balance(self):
+        """Fetches the account balance, cached for a second."""
+        return self.exchange.fetch_balance()
+
+    @ttl_cache(1.0)
     def get_current_price(self, symbol):
         """Fetches the current price for the given symbol."""
         try:
@@ -0,0 +1,57 @@
+import contextlib
+import queue
+import sqlite3
+import threading
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Opens a SQLite connection with the performance PRAGMAs applied.
+
+    WAL turns rollback-journal writes into sequential log appends and
+    synchronous=NORMAL drops the redundant fsync per commit, which keeps
+    writes on the trading loop from stalling on disk.
+    """
+    # A larger statement cache plus byte-identical SQL text means hot-path
+    # statements are prepared once and only re-bound afterwards.
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")
+    except Exception:
+        # Don't leak the handle (and its WAL/-shm locks) if a pragma fails
+        conn.close()
+        raise
+    return conn
+
+
+class SqlitePool:
+    """A small connection pool: one writer plus a few readers.
+
+    WAL allows many readers alongside a single writer, so queries from the
+    Telegram thread can run while the trading loop commits instead of
+    serializing everything through one lock.
+    """
+
+    def __init__(self, path: str, readers: int = 4) -> None:
+        self.write_conn = connect(path)
+        self.write_lock = threading.Lock()
+        self.readers: queue.Queue = queue.Queue()
+        for _ in range(readers):
+            self.readers.put(connect(path))
+
+    @contextlib.contextmanager
+    def write(self):
+        """Yields the writer connection; commits are the caller's job."""
+        with self.write_lock:
+            yield self.write_conn
+
+    @contextlib.contextmanager
+    def read(self):
+        """Yields a reader connection from the pool."""
+        conn = self.readers.get()
+        try:
+            yield conn
+        finally:
+            self.readers.put(conn)
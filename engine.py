@@ -1,49 +1,86 @@
-import sqlite3
 import logging
-from datetime import datetime
 from typing import Optional, List, Dict, Union
-from data import MarketData
+from data import MarketData, SYMBOL
+from db import SqlitePool
 from strategy import Strategy
+import asyncio
 import time
 import threading
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Module-level constant so the hot path always passes identical SQL text and
+# reuses the connection's prepared-statement cache.
+SQL_INSERT_CLOSED_TRADE = "INSERT INTO closed_trades (timestamp, symbol, side, amount, price, profit) VALUES (?, ?, ?, ?, ?, ?)"
 
 class TradingEngine:
     def __init__(self, dry_run: bool = True) -> None:
         self.market_data = MarketData()
         self.strategy = Strategy()
-        self.symbol: str = 'RUNE/USDT'
+        self.symbol: str = SYMBOL
         self.is_running: bool = False
         self.dry_run: bool = dry_run
         self.simulated_balance: float = 10000.0  # Simulated USDT balance for dry run mode
-        self.simulated_orders: List[Dict[str, Union[int, str, float]]] = []  # Track simulated orders
+        # Simulated orders as a columnar frame (one typed array per field)
+        # instead of a list of dicts: filters become vectorized masks and
+        # closed orders just flip the open flag
+        self.simulated_orders: pd.DataFrame = pd.DataFrame({
+            'id': pd.Series(dtype='int64'),
+            'timestamp': pd.Series(dtype='int64'),
+            'side': pd.Series(dtype='object'),
+            'amount': pd.Series(dtype='float64'),
+            'price': pd.Series(dtype='float64'),
+            'open': pd.Series(dtype='bool'),
+        })
         self.open_position: Optional[Dict[str, Union[int, str, float]]] = None  # Track the open position
-        
+        # Rolling in-memory candle history: the strategy computes from this
+        # frame directly instead of re-reading the whole table from disk on
+        # every bar. Warmed from the database at startup.
+        self.max_candles: int = 1000
+        try:
+            self.candles = self.strategy.read_price().tail(self.max_candles)
+        except Exception as e:
+            logger.error("Could not warm candle history from the database: %s", e)
+            self.candles = pd.DataFrame(columns=['open', 'high', 'low', 'close', 'volume'])
+        # An empty table yields object columns, which the indicators reject;
+        # float32 keeps the rolling history at half the memory footprint
+        self.candles = self.candles.astype('float32')
+        # Seed the incremental indicator state from the warmed history; each
+        # new bar is then an O(1) update instead of a full recompute
+        self.strategy.init_state(self.candles)
+
+        # One writer plus pooled readers: under WAL the Telegram thread can
+        # serve /stats while the trading loop commits trade logs.
+        self.app_pool = SqlitePool('app.db')
+
         # Initialize database and create table if it doesn't exist
         self.initialize_database()
 
     def initialize_database(self) -> None:
         """Initializes the database and creates the closed_trades table if it does not exist."""
         try:
-            conn = sqlite3.connect('app.db', check_same_thread=False)
-            cursor = conn.cursor()
-            # Create the closed_trades table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS closed_trades (
-                    id INTEGER PRIMARY KEY,
-                    timestamp TEXT,
-                    symbol TEXT,
-                    side TEXT,
-                    amount REAL,
-                    price REAL,
-                    profit REAL
-                )
-            """)
-            conn.commit()
-            logging.info("Database initialized and checked for the closed_trades table.")
+            with self.app_pool.write() as conn:
+                # Create the closed_trades table if it doesn't exist
+                # Epoch ms as INTEGER, the raw ccxt order timestamp; indexed
+                # so stats queries stay off full-table text compares
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS closed_trades (
+                        id INTEGER PRIMARY KEY,
+                        timestamp INTEGER,
+                        symbol TEXT,
+                        side TEXT,
+                        amount REAL,
+                        price REAL,
+                        profit REAL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_ts ON closed_trades(timestamp)")
+                conn.commit()
+            logger.info("Database initialized and checked for the closed_trades table.")
         except Exception as e:
-            logging.error(f"Error initializing database: {e}")
-        finally:
-            conn.close()
+            logger.error("Error initializing database: %s", e)
 
     def log_closed_trade(self, order: Dict[str, Union[int, str, float]], current_price: float) -> None:
         """Logs a closed trade to the database."""
@@ -52,46 +89,62 @@ class TradingEngine:
         profit = (current_price - order_price) * amount if order['side'] == 'buy' else (order_price - current_price) * amount
         
         try:
-            conn = sqlite3.connect('app.db', check_same_thread=False)
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO closed_trades (timestamp, symbol, side, amount, price, profit) VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    datetime.fromtimestamp(order['timestamp'] / 1000).isoformat(),
-                    self.symbol,
-                    order['side'],
-                    amount,
-                    order_price,
-                    profit
-                ))
-            conn.commit()
-            logging.info("Trade logged successfully.")
+            with self.app_pool.write() as conn:
+                conn.execute(SQL_INSERT_CLOSED_TRADE, (
+                        int(order['timestamp']),
+                        self.symbol,
+                        order['side'],
+                        amount,
+                        order_price,
+                        profit
+                    ))
+                conn.commit()
+            logger.debug("Trade logged successfully.")
         except Exception as e:
-            logging.error(f"Error logging closed trade: {e}")
-        finally:
-            conn.close()
+            logger.error("Error logging closed trade: %s", e)
+
+    def log_closed_trades(self, closed: pd.DataFrame, profits: np.ndarray) -> None:
+        """Logs a batch of closed trades to the database in one transaction."""
+        rows = [
+            (int(ts), self.symbol, side, float(amount), float(price), float(profit))
+            for ts, side, amount, price, profit
+            in zip(closed['timestamp'], closed['side'], closed['amount'], closed['price'], profits)
+        ]
+        try:
+            with self.app_pool.write() as conn:
+                conn.execute("BEGIN")
+                conn.executemany(SQL_INSERT_CLOSED_TRADE, rows)
+                conn.commit()
+            logger.debug("Logged %d closed trade(s).", len(rows))
+        except Exception as e:
+            logger.error("Error logging closed trades: %s", e)
 
     def show_trade_stats(self) -> str:
         """Fetches and displays trade statistics from the database."""
         try:
-            conn = sqlite3.connect('app.db', check_same_thread=False)
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM closed_trades")
-            trades = cursor.fetchall()
+            with self.app_pool.read() as conn:
+                # Let SQLite aggregate in C; only six scalars cross into Python
+                # instead of every row of the table
+                cursor = conn.execute("""
+                    SELECT COUNT(*),
+                           COALESCE(SUM(profit), 0),
+                           SUM(CASE WHEN profit > 0 THEN 1 ELSE 0 END),
+                           SUM(CASE WHEN profit <= 0 THEN 1 ELSE 0 END),
+                           COALESCE(SUM(CASE WHEN profit > 0 THEN profit END), 0),
+                           COALESCE(SUM(CASE WHEN profit <= 0 THEN profit END), 0)
+                    FROM closed_trades
+                """)
+                total_trades, total_profit, win_count, loss_count, win_profit, loss_profit = cursor.fetchone()
         except Exception as e:
-            logging.error(f"Error fetching trade stats: {e}")
+            logger.error("Error fetching trade stats: %s", e)
             return "Error fetching trade stats"
-        finally:
-            conn.close()
 
-        total_profit = sum(trade[5] for trade in trades)
-        total_trades = len(trades)
-        wins = [trade for trade in trades if trade[5] > 0]
-        losses = [trade for trade in trades if trade[5] <= 0]
-        win_rate = len(wins) / total_trades if total_trades > 0 else 0
-        average_win = sum(trade[5] for trade in wins) / len(wins) if wins else 0
-        average_loss = sum(trade[5] for trade in losses) / len(losses) if losses else 0
-        profit_factor = sum(trade[5] for trade in wins) / abs(sum(trade[5] for trade in losses)) if losses else float('inf')
+        win_count = win_count or 0
+        loss_count = loss_count or 0
+        win_rate = win_count / total_trades if total_trades > 0 else 0
+        average_win = win_profit / win_count if win_count else 0
+        average_loss = loss_profit / loss_count if loss_count else 0
+        profit_factor = win_profit / abs(loss_profit) if loss_profit else float('inf')
         stats = f"""
         Total Trades: {total_trades}
         Total Profit: {total_profit}
@@ -107,14 +160,14 @@ class TradingEngine:
         if self.dry_run:
             return self.simulated_balance
         try:
-            balance = self.market_data.exchange.fetch_balance()
+            balance = self.market_data.fetch_balance()
             usdt_balance = balance['total'].get('USDT')
             if usdt_balance is None:
-                logging.error("USDT balance not found in the fetched balance data.")
+                logger.error("USDT balance not found in the fetched balance data.")
                 return None
             return usdt_balance
         except Exception as e:
-            logging.error(f"An error occurred while fetching balance: {e}")
+            logger.error("An error occurred while fetching balance: %s", e)
             return None
     
     def calc_order(self, usdt_balance: float, current_price: float, risk_percentage: float = 90.0) -> float:
@@ -127,7 +180,7 @@ class TradingEngine:
         """Places an order (or simulates it if in dry run mode)."""
         current_price = self.market_data.get_current_price(self.symbol)
         if current_price is None:
-            logging.error("Current price could not be fetched; order not placed.")
+            logger.error("Current price could not be fetched; order not placed.")
             return None
 
         if self.dry_run:
@@ -145,71 +198,74 @@ class TradingEngine:
                 cost = current_price * amount
                 if self.simulated_balance >= cost:
                     self.simulated_balance -= cost
-                    logging.info(f"Simulated buy order for {amount} {self.symbol} at {current_price}. New balance: {self.simulated_balance} USDT.")
+                    logger.info("Simulated buy order for %s %s at %s. New balance: %s USDT.", amount, self.symbol, current_price, self.simulated_balance)
                 else:
-                    logging.warning("Insufficient balance for simulated buy order.")
+                    logger.warning("Insufficient balance for simulated buy order.")
                     return None
             elif side == 'sell':
                 # For simplicity, assume that the amount to sell is always available in the simulated context
                 revenue = current_price * amount
                 self.simulated_balance += revenue
-                logging.info(f"Simulated sell order for {amount} {self.symbol} at {current_price}. New balance: {self.simulated_balance} USDT.")
+                logger.info("Simulated sell order for %s %s at %s. New balance: %s USDT.", amount, self.symbol, current_price, self.simulated_balance)
 
-            self.simulated_orders.append(simulated_order)
+            self.simulated_orders = pd.concat([
+                self.simulated_orders,
+                pd.DataFrame(
+                    [[simulated_order['id'], simulated_order['timestamp'], side, amount, current_price, True]],
+                    columns=self.simulated_orders.columns
+                )
+            ], ignore_index=True)
             return simulated_order
         else:
             try:
                 order = self.market_data.exchange.create_market_order(self.symbol, side, amount)
-                logging.info(f"Placed {side} order for {amount} {self.symbol}. Order ID: {order['id']}")
+                logger.info("Placed %s order for %s %s. Order ID: %s", side, amount, self.symbol, order['id'])
                 return order
             except Exception as e:
-                logging.error(f"An error occurred while placing order: {e}")
+                logger.error("An error occurred while placing order: %s", e)
                 return None
 
     def close_orders(self, side: str) -> None:
         """Closes open orders of the specified side (buy/sell). Simulates closing if in dry run mode."""
         current_price = self.market_data.get_current_price(self.symbol)
         if current_price is None:
-            logging.error("Current price could not be fetched; cannot close orders.")
+            logger.error("Current price could not be fetched; cannot close orders.")
             return
 
         if self.dry_run:
-            closed_orders = []
-            for order in self.simulated_orders:
-                if order['side'] == side:
-                    # Calculate profit/loss based on the current price
-                    if side == 'buy':
-                        profit = (current_price - order['price']) * order['amount']
-                        self.simulated_balance += current_price * order['amount']
-                    else:  # side == 'sell'
-                        profit = (order['price'] - current_price) * order['amount']
-                        self.simulated_balance += current_price * order['amount']
-
-                    self.log_closed_trade(order, current_price)
-                    closed_orders.append(order)
-                    logging.info(f"Closed simulated {side} order ID: {order['id']} for {self.symbol}. Profit/Loss: {profit}. New balance: {self.simulated_balance} USDT")
-
-            # Remove closed orders from the list
-            self.simulated_orders = [o for o in self.simulated_orders if o not in closed_orders]
+            orders = self.simulated_orders
+            mask = (orders['side'] == side) & orders['open']
+            if not mask.any():
+                return
+            closed = orders.loc[mask]
+            # Profit/loss for the whole batch in one vectorized expression;
+            # no per-order Python branch on the side
+            sign = np.where(closed['side'].to_numpy() == 'buy', 1.0, -1.0)
+            profits = sign * (current_price - closed['price'].to_numpy()) * closed['amount'].to_numpy()
+            self.simulated_balance += float((current_price * closed['amount']).sum())
+            orders.loc[mask, 'open'] = False
+            self.log_closed_trades(closed, profits)
+            logger.info("Closed %d simulated %s order(s) for %s. Profit/Loss: %.2f. New balance: %s USDT", len(closed), side, self.symbol, profits.sum(), self.simulated_balance)
             return
         try:
             open_orders = self.market_data.exchange.fetch_open_orders(self.symbol)
             for order in open_orders:
                 if order['side'] == side:
                     self.market_data.exchange.cancel_order(order['id'], self.symbol)
-                    logging.info(f"Closed {side} order ID: {order['id']} for {self.symbol}")
+                    logger.info("Closed %s order ID: %s for %s", side, order['id'], self.symbol)
                     self.log_closed_trade(order, float(order['price']))
         except Exception as e:
-            logging.error(f"An error occurred while closing orders: {e}")
+            logger.error("An error occurred while closing orders: %s", e)
 
 
     def show_open_positions(self) -> str:
         """Returns a string representation of open positions."""
         if self.dry_run:
+            open_orders = self.simulated_orders[self.simulated_orders['open']]
             positions = "Open Positions (Simulated):\n"
-            for order in self.simulated_orders:
-                positions += f"ID: {order['id']}, Symbol: {order['symbol']}, Side: {order['side']}, Amount: {order['amount']}, Price: {order['price']}\n"
-            return positions if self.simulated_orders else "No open positions (Simulated)."
+            for order in open_orders.itertuples():
+                positions += f"ID: {order.id}, Symbol: {self.symbol}, Side: {order.side}, Amount: {order.amount}, Price: {order.price}\n"
+            return positions if len(open_orders) else "No open positions (Simulated)."
         try:
             open_orders = self.market_data.exchange.fetch_open_orders(self.symbol)
             positions = "Open Positions:\n"
@@ -217,24 +273,53 @@ class TradingEngine:
                 positions += f"ID: {order['id']}, Symbol: {order['symbol']}, Side: {order['side']}, Amount: {order['amount']}, Price: {order['price']}, Status: {order['status']}\n"
             return positions if open_orders else "No open positions."
         except Exception as e:
-            logging.error(f"An error occurred while fetching open positions: {e}")
+            logger.error("An error occurred while fetching open positions: %s", e)
             return "An error occurred while fetching open positions."
         
-    def execute_order(self) -> None:
-        """Executes the trading strategy based on the latest market data."""
+    def append_candles(self, ohlcv: List[list]) -> None:
+        """Appends new OHLCV rows to the in-memory frame, dropping the oldest."""
+        new = pd.DataFrame([c[:6] for c in ohlcv], columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        new['timestamp'] = pd.to_datetime(new['timestamp'], unit='ms')
+        new.set_index('timestamp', inplace=True)
+        # Match the history's float32 so the concat doesn't upcast everything
+        self.candles = pd.concat([self.candles, new.astype('float32')])
+        # The feed can re-push a bar after a reconnect; keep the newest copy
+        self.candles = self.candles[~self.candles.index.duplicated(keep='last')]
+        if len(self.candles) > self.max_candles:
+            self.candles = self.candles.iloc[-self.max_candles:]
+
+    async def execute_order(self, ohlcv: Optional[List[list]] = None) -> None:
+        """Executes the trading strategy based on the latest market data.
+
+        Network calls run in worker threads so they never block the event
+        loop, and the balance fetch overlaps the indicator update instead of
+        serializing after it.
+        """
         try:
-            ohlcv = self.market_data.fetch_data()
-            logging.info(f"Fetched market data: {ohlcv}")
+            if ohlcv is None:
+                ohlcv = await asyncio.to_thread(self.market_data.fetch_data)
+            if not ohlcv:
+                logger.error("No market data available; skipping this cycle.")
+                return
+            # Fire the balance round-trip now; it completes while the
+            # indicators advance
+            balance_task = asyncio.create_task(asyncio.to_thread(self.get_balance))
+            self.append_candles(ohlcv)
+            # Persistence is bookkeeping only; the strategy reads the
+            # in-memory frame, not the database
             self.market_data.save_to_db(ohlcv)
-            df = self.strategy.read_price()
-            df = self.strategy.calc_indicators(df)
-            df = self.strategy.entry_signals(df)
-            df = self.strategy.exit_signals(df)
-
-            latest = df.iloc[-1]
-            balance = self.get_balance()
+            # Advance the indicator recurrences by the new bars only; the
+            # full calc_indicators recompute is for cold starts/backtests
+            latest = None
+            for row in ohlcv:
+                vals = self.strategy.calc_indicators_incremental(row)
+                if vals is not None:
+                    latest = vals
+            balance = await balance_task
+            if latest is None:
+                return
             if balance is None:
-                logging.error("Cannot execute order due to missing balance.")
+                logger.error("Cannot execute order due to missing balance.")
                 return
             current_price = latest['close']
             order_amount = self.calc_order(balance, current_price)
@@ -243,31 +328,55 @@ class TradingEngine:
             if self.open_position is None:
                 # Enter long or short only if there's no open position
                 if latest.get('enter_long') == 1:
-                    order = self.place_order('buy', order_amount)
+                    order = await asyncio.to_thread(self.place_order, 'buy', order_amount)
                     if order:
                         self.open_position = order
                 elif latest.get('enter_short') == 1:
-                    order = self.place_order('sell', order_amount)
+                    order = await asyncio.to_thread(self.place_order, 'sell', order_amount)
                     if order:
                         self.open_position = order
             else:
                 # If there is an open position, check if an exit signal is given
                 if self.open_position['side'] == 'buy' and latest.get('exit_long') == 1:
-                    self.close_orders('buy')
+                    await asyncio.to_thread(self.close_orders, 'buy')
                     self.open_position = None  # Clear the open position after closing
                 elif self.open_position['side'] == 'sell' and latest.get('exit_short') == 1:
-                    self.close_orders('sell')
+                    await asyncio.to_thread(self.close_orders, 'sell')
                     self.open_position = None  # Clear the open position after closing
 
         except Exception as e:
-            logging.error(f"An error occurred during order execution: {e}")
+            logger.error("An error occurred during order execution: %s", e)
 
     def start_trading(self) -> None:
-        """Starts the trading engine."""
+        """Starts the trading engine. Blocks until stop_trading is called."""
         self.is_running = True
-        while self.is_running:
-            self.execute_order()
-            time.sleep(60)
+        asyncio.run(self.watch_candles())
+
+    async def watch_candles(self) -> None:
+        """Runs the strategy whenever the exchange pushes a finished 1m candle.
+
+        Candles arrive over WebSocket instead of being polled over REST every
+        60 seconds, so there is no idle sleep and no per-loop round-trip.
+        """
+        await asyncio.to_thread(self.market_data.prime_exchange)
+        exchange = self.market_data.create_ws_exchange()
+        last_candle = None
+        try:
+            while self.is_running:
+                try:
+                    candles = await exchange.watch_ohlcv(self.symbol, '1m')
+                except Exception as e:
+                    logger.error("Error on the candle feed: %s", e)
+                    await asyncio.sleep(5)
+                    continue
+                # watch_ohlcv also pushes updates for the still-building bar;
+                # only act when the bar timestamp advances (previous bar closed)
+                latest = candles[-1]
+                if last_candle is not None and latest[0] != last_candle[0]:
+                    await self.execute_order([last_candle])
+                last_candle = latest
+        finally:
+            await exchange.close()
 
     def stop_trading(self) -> None:
         """Stops the trading engine."""
@@ -278,7 +387,7 @@ class TradingEngine:
         if self.open_position:
             current_price = self.market_data.get_current_price(self.symbol)
             if current_price is None:
-                logging.error("Current price could not be fetched; cannot provide status.")
+                logger.error("Current price could not be fetched; cannot provide status.")
                 return "Unable to fetch the current price."
 
             order_side = self.open_position['side']
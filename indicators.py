@@ -0,0 +1,258 @@
+"""Jitted indicator kernels shared by the strategy and batch backtests.
+
+Everything here operates on plain NumPy arrays: no pandas_ta, no per-row
+Series creation, and outputs follow the input dtype so float32 frames stay
+float32 end to end.
+"""
+import numpy as np
+import pandas as pd
+from numba import njit, prange
+
+
+@njit(cache=True, nogil=True)
+def sma_fast(x, window):
+    """O(n) rolling mean: carry a running sum instead of summing each window."""
+    n = x.size
+    out = np.full(n, np.nan, x.dtype)
+    if n < window:
+        return out
+    s = 0.0
+    for i in range(window):
+        s += x[i]
+    out[window - 1] = s / window
+    for i in range(window, n):
+        s += x[i] - x[i - window]
+        out[i] = s / window
+    return out
+
+
+@njit(cache=True, nogil=True)
+def pipeline_fast(high, low, close, volume, sma_short, sma_long, hvi_period, st_period, st_mult):
+    """Computes every indicator and signal column in one pass over the OHLCV.
+
+    SMA running sums, the HVI rolling max, the Supertrend recurrence and the
+    entry/exit flags all advance inside a single loop, so the arrays are read
+    once instead of once per indicator.
+    """
+    n = close.size
+    # Outputs follow the input dtype, so float32 frames stay float32 end to
+    # end; the scalar accumulators below still run in float64 for precision
+    sma20 = np.full(n, np.nan, close.dtype)
+    sma100 = np.full(n, np.nan, close.dtype)
+    hvi_out = np.full(n, np.nan, close.dtype)
+    st_long = np.full(n, np.nan, close.dtype)
+    st_short = np.full(n, np.nan, close.dtype)
+    enter_long = np.zeros(n, dtype=np.int8)
+    enter_short = np.zeros(n, dtype=np.int8)
+    exit_long = np.zeros(n, dtype=np.int8)
+    exit_short = np.zeros(n, dtype=np.int8)
+    sum_short = 0.0
+    sum_long = 0.0
+    atr = 0.0
+    have_atr = False
+    tr_sum = 0.0
+    final_upper = 0.0
+    final_lower = 0.0
+    have_bands = False
+    trend = 1
+    for i in range(n):
+        c = close[i]
+        # Running-sum SMAs
+        sum_short += c
+        if i >= sma_short:
+            sum_short -= close[i - sma_short]
+        if i >= sma_short - 1:
+            sma20[i] = sum_short / sma_short
+        sum_long += c
+        if i >= sma_long:
+            sum_long -= close[i - sma_long]
+        if i >= sma_long - 1:
+            sma100[i] = sum_long / sma_long
+        # HVI against the max volume of the previous hvi_period bars
+        if i >= hvi_period:
+            hv = volume[i - hvi_period]
+            for j in range(i - hvi_period + 1, i):
+                if volume[j] > hv:
+                    hv = volume[j]
+            hvi_out[i] = volume[i] * 100.0 / hv
+        # Supertrend recurrence, same seeding as supertrend_fast
+        if i == 0:
+            tr = high[0] - low[0]
+        else:
+            tr = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        if not have_atr:
+            tr_sum += tr
+            if i + 1 >= st_period:
+                atr = tr_sum / st_period
+                have_atr = True
+        else:
+            atr = (atr * (st_period - 1) + tr) / st_period
+        if have_atr:
+            mid = (high[i] + low[i]) / 2.0
+            basic_upper = mid + st_mult * atr
+            basic_lower = mid - st_mult * atr
+            prev_close = close[i - 1] if i > 0 else close[0]
+            if not have_bands or basic_upper < final_upper or prev_close > final_upper:
+                final_upper = basic_upper
+            if not have_bands or basic_lower > final_lower or prev_close < final_lower:
+                final_lower = basic_lower
+            have_bands = True
+            if trend == 1 and c < final_lower:
+                trend = -1
+            elif trend == -1 and c > final_upper:
+                trend = 1
+            if trend == 1:
+                st_long[i] = final_lower
+            else:
+                st_short[i] = final_upper
+        # Signals from this bar's freshly computed values (NaNs compare False)
+        if c > sma20[i] and c > sma100[i] and hvi_out[i] > 100.0 and c > st_long[i]:
+            enter_long[i] = 1
+        if c < sma20[i] and c < sma100[i] and hvi_out[i] > 100.0 and c < st_short[i]:
+            enter_short[i] = 1
+        if c < st_long[i]:
+            exit_long[i] = 1
+        if c > st_short[i]:
+            exit_short[i] = 1
+    return sma20, sma100, hvi_out, st_long, st_short, enter_long, enter_short, exit_long, exit_short
+
+
+@njit(cache=True, nogil=True, parallel=True)
+def pipeline_multi(high, low, close, volume, sma_short, sma_long, hvi_period, st_period, st_mult):
+    """pipeline_fast over a (symbols, n) matrix, one symbol per thread.
+
+    Symbols share nothing, so the rows are trivially data-parallel; prange
+    scales the batch-backtest case near-linearly with physical cores.
+    Inputs are row-major matrices with one symbol per row, outputs match.
+    """
+    m, n = close.shape
+    sma20 = np.empty((m, n), close.dtype)
+    sma100 = np.empty((m, n), close.dtype)
+    hvi_out = np.empty((m, n), close.dtype)
+    st_long = np.empty((m, n), close.dtype)
+    st_short = np.empty((m, n), close.dtype)
+    enter_long = np.empty((m, n), np.int8)
+    enter_short = np.empty((m, n), np.int8)
+    exit_long = np.empty((m, n), np.int8)
+    exit_short = np.empty((m, n), np.int8)
+    for s in prange(m):
+        (sma20[s], sma100[s], hvi_out[s], st_long[s], st_short[s],
+         enter_long[s], enter_short[s], exit_long[s], exit_short[s]) = pipeline_fast(
+            high[s], low[s], close[s], volume[s],
+            sma_short, sma_long, hvi_period, st_period, st_mult)
+    return sma20, sma100, hvi_out, st_long, st_short, enter_long, enter_short, exit_long, exit_short
+
+
+@njit(cache=True, nogil=True)
+def supertrend_fast(high, low, close, period, multiplier):
+    """Supertrend (Wilder ATR + band carry) fused into one pass over the arrays.
+
+    Returns the long and short band arrays; the active band carries the trend
+    line and the other side is NaN, matching the SUPERTl/SUPERTs split of
+    pandas_ta. Same recurrence as the incremental per-bar path.
+    """
+    n = close.size
+    st_long = np.full(n, np.nan, close.dtype)
+    st_short = np.full(n, np.nan, close.dtype)
+    atr = 0.0
+    have_atr = False
+    tr_sum = 0.0
+    final_upper = 0.0
+    final_lower = 0.0
+    have_bands = False
+    trend = 1
+    for i in range(n):
+        if i == 0:
+            tr = high[0] - low[0]
+        else:
+            tr = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        if not have_atr:
+            # Seed the ATR with a plain average of the first `period` TRs
+            tr_sum += tr
+            if i + 1 < period:
+                continue
+            atr = tr_sum / period
+            have_atr = True
+        else:
+            atr = (atr * (period - 1) + tr) / period
+        mid = (high[i] + low[i]) / 2.0
+        basic_upper = mid + multiplier * atr
+        basic_lower = mid - multiplier * atr
+        prev_close = close[i - 1] if i > 0 else close[0]
+        if not have_bands or basic_upper < final_upper or prev_close > final_upper:
+            final_upper = basic_upper
+        if not have_bands or basic_lower > final_lower or prev_close < final_lower:
+            final_lower = basic_lower
+        have_bands = True
+        if trend == 1 and close[i] < final_lower:
+            trend = -1
+        elif trend == -1 and close[i] > final_upper:
+            trend = 1
+        if trend == 1:
+            st_long[i] = final_lower
+        else:
+            st_short[i] = final_upper
+    return st_long, st_short
+
+
+# Memoized Supertrend results for backtests that recompute the same slice
+# across parameter sweeps; a handful of entries is plenty since a grid
+# search reuses one price slice per combination
+_ST_CACHE = {}
+_ST_CACHE_MAX = 8
+
+
+def supertrend_cached(high, low, close, period, multiplier):
+    """supertrend_fast with memoization on the input arrays and parameters.
+
+    Keyed on a hash of the raw array bytes, so identical slices across
+    repeated backtest runs return the cached bands in O(1). Callers must
+    treat the input arrays as immutable: mutating one in place after the
+    call would let a stale entry alias the new data.
+    """
+    key = (close.size, hash(high.tobytes()), hash(low.tobytes()),
+           hash(close.tobytes()), period, multiplier)
+    hit = _ST_CACHE.get(key)
+    if hit is not None:
+        return hit
+    result = supertrend_fast(high, low, close, period, multiplier)
+    if len(_ST_CACHE) >= _ST_CACHE_MAX:
+        _ST_CACHE.pop(next(iter(_ST_CACHE)))
+    _ST_CACHE[key] = result
+    return result
+
+
+@njit(cache=True, nogil=True)
+def rolling_max(x, window):
+    """Amortized O(n) rolling max via a monotonic deque of candidate indices.
+
+    Each index enters and leaves the deque at most once, so the cost is
+    independent of the window size — unlike the O(n*w) strided-view max,
+    which only stays cheap while the window is small.
+    """
+    n = x.size
+    out = np.full(n, np.nan, x.dtype)
+    dq = np.empty(n, np.int64)
+    head = 0
+    tail = 0  # dq[head:tail] holds indices whose values strictly decrease
+    for i in range(n):
+        while tail > head and x[dq[tail - 1]] <= x[i]:
+            tail -= 1
+        dq[tail] = i
+        tail += 1
+        if dq[head] <= i - window:
+            head += 1
+        if i >= window - 1:
+            out[i] = x[dq[head]]
+    return out
+
+
+def hvi(dataframe, period=10):
+    # Rolling max over the raw volume array via the deque kernel instead of
+    # a pandas rolling max plus two intermediate Series allocations
+    vol = dataframe['volume'].to_numpy()
+    hv = rolling_max(vol, period)
+    shifted = np.empty_like(hv)
+    shifted[0] = np.nan
+    shifted[1:] = hv[:-1]
+    return pd.Series(vol * 100.0 / shifted, index=dataframe.index)
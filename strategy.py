@@ -1,75 +1,251 @@
+import numpy as np
+import os
 import pandas as pd
-import pandas_ta as pta
 import sqlite3
 import logging
+from collections import deque
+from data import PARQUET_PATH
+from indicators import hvi, pipeline_fast, pipeline_multi, rolling_max, sma_fast, supertrend_cached, supertrend_fast
 
 logger = logging.getLogger(__name__)
 
-
-def hvi(dataframe, period=10):
-    HV = dataframe['volume'].rolling(window=period).max()
-    HVI = dataframe['volume'] * 100 / HV.shift(1)
-    return HVI
+# On-disk cache of computed indicator frames. The config tag is part of the
+# file name, so changing any indicator parameter naturally invalidates the
+# cache instead of silently reusing stale columns.
+IND_CACHE_DIR = 'cache'
+IND_CONFIG = 'sma20-100_hvi10_st7x3.0'
+# Bars re-fed ahead of the new tail so the windowed indicators and the ATR
+# recurrence have settled before the first row we actually keep
+IND_WARMUP = 150
+IND_CACHE_ROWS = 50000
 
 class Strategy:
     def __init__(self):
-        self.conn = sqlite3.connect('data.db', check_same_thread=False)
+        # Read-only URI connection: the strategy never writes, so mode=ro
+        # skips the write-lock machinery, and mmap_size lets SQLite serve
+        # page reads straight from a memory mapping instead of pread + copy.
+        # The writer in data.py owns journal_mode=WAL.
+        try:
+            self.conn = sqlite3.connect('file:data.db?mode=ro', uri=True, check_same_thread=False)
+        except sqlite3.OperationalError:
+            # Cold start before the writer has created the database; a plain
+            # connection creates the file
+            self.conn = sqlite3.connect('data.db', check_same_thread=False)
+        self.conn.execute("PRAGMA mmap_size=268435456")
+        self.conn.execute("PRAGMA cache_size=-65536")
+        # Incremental indicator state; seeded via init_state
+        self.state = None
 
-    def read_price(self):
-        logging.info("Reading price data")
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM RUNE_USDT_prices")
-        rows = cursor.fetchall()
-        df = pd.DataFrame(rows, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df.set_index('timestamp', inplace=True)
-        return df
+    def init_state(self, df):
+        """Seeds the incremental indicator state by replaying the history once.
+
+        After this, calc_indicators_incremental advances every indicator by
+        one bar in O(1) instead of recomputing the whole frame per bar.
+        """
+        self.state = {
+            'close20': deque(maxlen=20),
+            'sum20': 0.0,
+            'close100': deque(maxlen=100),
+            'sum100': 0.0,
+            'volumes': deque(maxlen=10),
+            'tr_window': deque(maxlen=7),
+            'atr': None,
+            'final_upper': None,
+            'final_lower': None,
+            'trend': 1,
+            'prev_close': None,
+            'last_ts': -1,
+        }
+        for high, low, close, volume in zip(df['high'], df['low'], df['close'], df['volume']):
+            self._advance(float(high), float(low), float(close), float(volume))
+        if len(df) > 0:
+            self.state['last_ts'] = int(df.index[-1].value // 10**6)
+
+    def calc_indicators_incremental(self, row):
+        """Advances the indicators by one raw OHLCV row and returns a dict with
+        the indicator values and entry/exit flags for that bar.
+
+        Rows at or before the last seen timestamp are skipped (the feed can
+        re-push a bar) and return None.
+        """
+        ts, _open, high, low, close, volume = (float(v) for v in row[:6])
+        if ts <= self.state['last_ts']:
+            return None
+        vals = self._advance(high, low, close, volume)
+        self.state['last_ts'] = int(ts)
+        vals['close'] = close
+        # NaN indicator values compare False, same as the vectorized masks
+        vals['enter_long'] = int(close > vals['sma20'] and close > vals['sma100'] and vals['hvi'] > 100 and close > vals['ST_long'])
+        vals['enter_short'] = int(close < vals['sma20'] and close < vals['sma100'] and vals['hvi'] > 100 and close < vals['ST_short'])
+        vals['exit_long'] = int(close < vals['ST_long'])
+        vals['exit_short'] = int(close > vals['ST_short'])
+        return vals
+
+    def _advance(self, high, low, close, volume):
+        """Advances every indicator recurrence by one bar and returns the values."""
+        s = self.state
+        # HVI compares against the max volume of the previous 10 bars
+        hvi_val = volume * 100.0 / max(s['volumes']) if len(s['volumes']) == 10 else float('nan')
+        s['volumes'].append(volume)
+        # Rolling-sum SMA update: add the new close, drop the evicted one
+        for window in (20, 100):
+            dq = s[f'close{window}']
+            if len(dq) == window:
+                s[f'sum{window}'] -= dq[0]
+            dq.append(close)
+            s[f'sum{window}'] += close
+        sma20 = s['sum20'] / 20 if len(s['close20']) == 20 else float('nan')
+        sma100 = s['sum100'] / 100 if len(s['close100']) == 100 else float('nan')
+        st_long, st_short = self._advance_supertrend(high, low, close)
+        s['prev_close'] = close
+        return {'sma20': sma20, 'sma100': sma100, 'hvi': hvi_val, 'ST_long': st_long, 'ST_short': st_short}
+
+    def _advance_supertrend(self, high, low, close, period=7, multiplier=3.0):
+        """One step of the Supertrend recurrence (Wilder ATR + band carry)."""
+        s = self.state
+        prev_close = s['prev_close']
+        if prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        if s['atr'] is None:
+            # Seed the ATR with a plain average of the first `period` TRs
+            s['tr_window'].append(tr)
+            if len(s['tr_window']) < period:
+                return float('nan'), float('nan')
+            s['atr'] = sum(s['tr_window']) / period
+        else:
+            s['atr'] = (s['atr'] * (period - 1) + tr) / period
+        mid = (high + low) / 2.0
+        basic_upper = mid + multiplier * s['atr']
+        basic_lower = mid - multiplier * s['atr']
+        final_upper = s['final_upper']
+        final_lower = s['final_lower']
+        if final_upper is None or basic_upper < final_upper or prev_close > final_upper:
+            final_upper = basic_upper
+        if final_lower is None or basic_lower > final_lower or prev_close < final_lower:
+            final_lower = basic_lower
+        trend = s['trend']
+        if trend == 1 and close < final_lower:
+            trend = -1
+        elif trend == -1 and close > final_upper:
+            trend = 1
+        s['final_upper'] = final_upper
+        s['final_lower'] = final_lower
+        s['trend'] = trend
+        if trend == 1:
+            return final_lower, float('nan')
+        return float('nan'), final_upper
+
+    def read_price(self, limit=1000):
+        logger.info("Reading price data")
+        # Prefer the columnar snapshot: Parquet decodes into typed arrays
+        # without a Python tuple per row. The rows written after the last
+        # snapshot flush are topped up from the SQLite log.
+        try:
+            df = pd.read_parquet(PARQUET_PATH)
+        except Exception:
+            df = None
+        last_ts = int(df['timestamp'].iloc[-1]) if df is not None and len(df) else -1
+        # Pull only the newest rows via the timestamp index, and let read_sql
+        # fill typed columns in batches instead of boxing a Python tuple per
+        # row through cursor.fetchall
+        tail = pd.read_sql_query(
+            "SELECT * FROM RUNE_USDT_prices WHERE timestamp > ? ORDER BY timestamp DESC LIMIT ?",
+            self.conn, params=(last_ts, limit))
+        tail = tail.iloc[::-1]  # back to chronological order
+        if df is None:
+            df = tail
+        elif len(tail):
+            # Skip the concat for an empty tail: concatenating an empty frame
+            # upcasts the typed snapshot columns to object
+            df = pd.concat([df, tail], ignore_index=True)
+        df = df.tail(limit).copy()
+        # Epoch-ms integers convert on pandas' C fast path with unit='ms';
+        # no per-row string parsing anywhere on the read side
+        df.index = pd.to_datetime(df.pop('timestamp'), unit='ms')
+        # float32 halves the memory traffic through the kernels; exchange
+        # prices carry nowhere near float64's 15 significant digits anyway
+        return df.astype(np.float32)
     
     def calc_indicators(self, df):
         logger.info("Calculating indicators")
-        
-        # Calculate SMAs with sufficient data points
-        df['sma20'] = pta.sma(df['close'], length=20)
-        
-        # Calculate sma100 only if there are enough data points
-        if len(df['close']) >= 100:  # Ensure enough data points for sma100
-            df['sma100'] = pta.sma(df['close'], length=100)
-        else:
-            df['sma100'] = float('nan')  # Set sma100 to NA if not enough data points
-
-        df['hvi'] = hvi(df, period=10)
 
-        # Supertrend
+        # One fused kernel call: SMAs, HVI, Supertrend and the signal flags
+        # all come out of a single pass over the arrays, so the OHLCV is read
+        # once instead of once per indicator
         periodo = 7
         atr_multiplicador = 3.0
-        df['ST_long'] = pta.supertrend(df['high'], df['low'], df['close'], length=periodo, multiplier=atr_multiplicador)[f'SUPERTl_{periodo}_{atr_multiplicador}']
-        df['ST_short'] = pta.supertrend(df['high'], df['low'], df['close'], length=periodo, multiplier=atr_multiplicador)[f'SUPERTs_{periodo}_{atr_multiplicador}']
-        return df
+        (sma20, sma100, hvi_vals, st_long, st_short,
+         enter_long, enter_short, exit_long, exit_short) = pipeline_fast(
+            df['high'].to_numpy(),
+            df['low'].to_numpy(),
+            df['close'].to_numpy(),
+            df['volume'].to_numpy(),
+            20, 100, 10, periodo, atr_multiplicador)
+        # Attach everything in one concat: each df[col] = ... assignment
+        # re-checks the block layout and can trigger a copy, so nine of them
+        # fragment the frame. One concat builds the final frame in one go.
+        new_cols = pd.DataFrame({
+            'sma20': sma20,
+            'sma100': sma100,
+            'hvi': hvi_vals,
+            'ST_long': st_long,
+            'ST_short': st_short,
+            'enter_long': enter_long,
+            'enter_short': enter_short,
+            'exit_long': exit_long,
+            'exit_short': exit_short,
+        }, index=df.index)
+        return pd.concat([df, new_cols], axis=1)
+
+    def calc_indicators_cached(self, df):
+        """calc_indicators with an on-disk cache of already-computed rows.
+
+        Rows up to the cached last timestamp are reused as-is; only the new
+        tail is recomputed (fed with a warmup window so the recurrences have
+        settled), then the refreshed cache is rewritten. Repeated backtest
+        runs over mostly-unchanged history skip almost all of the work.
+        """
+        path = os.path.join(IND_CACHE_DIR, f'RUNE_USDT_{IND_CONFIG}.parquet')
+        try:
+            cached = pd.read_parquet(path)
+        except Exception:
+            cached = None
+        if cached is not None and len(cached):
+            last = cached.index[-1]
+            new_rows = int((df.index > last).sum())
+            if new_rows == 0:
+                return cached
+            warm_start = max(0, len(df) - new_rows - IND_WARMUP)
+            recomputed = self.calc_indicators(df.iloc[warm_start:].copy())
+            result = pd.concat([cached, recomputed[recomputed.index > last]])
+        else:
+            result = self.calc_indicators(df.copy())
+        result = result.tail(IND_CACHE_ROWS)
+        try:
+            os.makedirs(IND_CACHE_DIR, exist_ok=True)
+            result.to_parquet(path)
+        except Exception as e:
+            logger.error(f"Error writing indicator cache: {e}")
+        return result
 
     def entry_signals(self, df):
-        df['enter_long'] = 0
-        df['enter_short'] = 0
-        df.loc[
-            (df['close'] > df['sma20']) &
-            (df['close'] > df['sma100']) &
-            (df['hvi'] > 100) &
-            (df['close'] > df['ST_long']),
-            'enter_long'] = 1
-        df.loc[
-            (df['close'] < df['sma20']) &
-            (df['close'] < df['sma100']) &
-            (df['hvi'] > 100) &
-            (df['close'] < df['ST_short']),
-            'enter_short'] = 1
+        # One fused boolean expression per side on the raw arrays: no
+        # intermediate Series per '&' and no .loc index alignment, and int8
+        # flags take an eighth of the memory of the default int64
+        close = df['close'].to_numpy()
+        sma20 = df['sma20'].to_numpy()
+        sma100 = df['sma100'].to_numpy()
+        hvi_vals = df['hvi'].to_numpy()
+        st_long = df['ST_long'].to_numpy()
+        st_short = df['ST_short'].to_numpy()
+        df['enter_long'] = ((close > sma20) & (close > sma100) & (hvi_vals > 100) & (close > st_long)).astype(np.int8)
+        df['enter_short'] = ((close < sma20) & (close < sma100) & (hvi_vals > 100) & (close < st_short)).astype(np.int8)
         return df
-    
+
     def exit_signals(self, df):
-        df['exit_long'] = 0
-        df['exit_short'] = 0
-        df.loc[
-            (df['close'] < df['ST_long']),
-            'exit_long'] = 1
-        df.loc[
-            (df['close'] > df['ST_short']),
-            'exit_short'] = 1
+        close = df['close'].to_numpy()
+        df['exit_long'] = (close < df['ST_long'].to_numpy()).astype(np.int8)
+        df['exit_short'] = (close > df['ST_short'].to_numpy()).astype(np.int8)
         return df
@@ -1,16 +1,25 @@
+import asyncio
 import logging
-import threading
 from typing import Optional
 from config import TELEGRAM_TOKEN
+from data import ttl_cache
 from telegram import ReplyKeyboardMarkup, Update
 from telegram.ext import Application, CommandHandler, CallbackContext
 
+# How long a command reply may be served from cache; spamming a button
+# within this window costs a dict lookup instead of an exchange/DB round-trip
+REPLY_TTL_S = 5.0
+
 class TelegramBot:
     def __init__(self, trading_engine) -> None:
         self.application = Application.builder().token(TELEGRAM_TOKEN).build()
         self.trading_engine = trading_engine
-        self.trading_thread: Optional[threading.Thread] = None
-        self.lock = threading.Lock()  # Lock for thread safety
+        # The trading loop runs as a task on the bot's own event loop (its
+        # blocking body on a worker thread via to_thread), so command
+        # handlers stay responsive instead of lock-stepping with a raw
+        # daemon thread
+        self.trading_task: Optional[asyncio.Task] = None
+        self.lock = asyncio.Lock()
 
         self.application.add_handler(CommandHandler("start", self.start))
         self.application.add_handler(CommandHandler("stats", self.stats))
@@ -30,9 +39,28 @@ class TelegramBot:
             reply_markup=self.reply_markup
         )
 
+    # Side-effect-free engine queries, cached for a few seconds so bursty
+    # command spamming doesn't hammer the exchange or the database
+
+    @ttl_cache(REPLY_TTL_S)
+    def _cached_stats(self):
+        return self.trading_engine.show_trade_stats()
+
+    @ttl_cache(REPLY_TTL_S)
+    def _cached_balance(self):
+        return self.trading_engine.get_balance()
+
+    @ttl_cache(REPLY_TTL_S)
+    def _cached_positions(self):
+        return self.trading_engine.show_open_positions()
+
+    @ttl_cache(REPLY_TTL_S)
+    def _cached_status(self):
+        return self.trading_engine.get_trade_status()
+
     async def stats(self, update: Update, context: CallbackContext) -> None:
         try:
-            stats = self.trading_engine.show_trade_stats()
+            stats = self._cached_stats()
             await update.message.reply_text(stats)
         except Exception as e:
             logging.error(f"Error fetching stats: {e}")
@@ -43,7 +71,7 @@ class TelegramBot:
 
     async def balance(self, update: Update, context: CallbackContext) -> None:
         try:
-            balance = self.trading_engine.get_balance()
+            balance = self._cached_balance()
             if balance is not None:
                 await update.message.reply_text(f"Balance: {balance}")
             else:
@@ -54,7 +82,7 @@ class TelegramBot:
 
     async def positions(self, update: Update, context: CallbackContext) -> None:
         try:
-            positions = self.trading_engine.show_open_positions()
+            positions = self._cached_positions()
             await update.message.reply_text(positions)
         except Exception as e:
             logging.error(f"Error fetching positions: {e}")
@@ -62,18 +90,18 @@ class TelegramBot:
 
     async def status(self, update: Update, context: CallbackContext) -> None:
         try:
-            status = self.trading_engine.get_trade_status()
+            status = self._cached_status()
             await update.message.reply_text(status)
         except Exception as e:
             logging.error(f"Error fetching status: {e}")
             await update.message.reply_text("An error occurred while fetching the status.")
 
     async def runbot(self, update: Update, context: CallbackContext) -> None:
-        with self.lock:
+        async with self.lock:
             if not self.trading_engine.is_running:
                 self.trading_engine.is_running = True
-                self.trading_thread = threading.Thread(target=self.trading_engine.start_trading, daemon=True)
-                self.trading_thread.start()
+                self.trading_task = asyncio.create_task(
+                    asyncio.to_thread(self.trading_engine.start_trading))
                 logging.info("Trading bot started.")
                 await update.message.reply_text("Trading bot started!")
             else:
@@ -81,11 +109,14 @@ class TelegramBot:
                 await update.message.reply_text("Trading bot is already running.")
 
     async def stopbot(self, update: Update, context: CallbackContext) -> None:
-        with self.lock:
+        async with self.lock:
             if self.trading_engine.is_running:
                 self.trading_engine.stop_trading()
-                if self.trading_thread:
-                    self.trading_thread.join()
+                if self.trading_task:
+                    # Awaiting instead of join(): the handler yields to the
+                    # event loop while the trading loop winds down
+                    await self.trading_task
+                    self.trading_task = None
                 logging.info("Trading bot stopped.")
                 await update.message.reply_text("Trading bot stopped!")
             else: